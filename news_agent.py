@@ -1,69 +1,255 @@
 import os
-import json
+import re
+import math
+import time
+import pickle
+import logging
 import smtplib
+import sqlite3
 import hashlib
+import asyncio
+import functools
+import email.policy
+from email.generator import BytesGenerator
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from io import BytesIO
 from datetime import datetime, timezone, timedelta
-import requests
+import aiohttp
+import ahocorasick
+import jinja2
+import orjson
 
-DATA_FILE = 'seen_articles.json'
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+log = logging.getLogger(__name__)
+
+DATA_FILE = 'seen_articles.bloom'
+DB_FILE = 'seen_articles.db'
 ORG_FILE = 'orgs.txt'
 FILTERS_FILE = 'filters.json'
 
+class BloomFilter:
+    """Fixed-size Bloom filter for dedup keys.
+
+    Membership is O(k) bit probes; a rare false positive only means one
+    duplicate article slips through the digest, and there are no false
+    negatives. Sized for ~1M keys at p=0.001 this is ~1.8 MB on disk vs
+    hundreds of MB of hex strings in the old JSON dict.
+    """
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        self.num_bits = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _indexes(self, key):
+        # Kirsch-Mitzenmacher: derive k probe indexes as h1 + i*h2. Keys
+        # are already 16-byte BLAKE2b digests, so the two halves serve as
+        # h1/h2 directly with no extra hash call.
+        h1 = int.from_bytes(key[:8], 'big')
+        h2 = int.from_bytes(key[8:], 'big')
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for idx in self._indexes(key):
+            self.bits[idx >> 3] |= 1 << (idx & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[idx >> 3] & (1 << (idx & 7)) for idx in self._indexes(key))
+
 def load_stored_hashes():
     if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+        with open(DATA_FILE, 'rb') as f:
+            return pickle.load(f)
+    return BloomFilter()
+
+def save_stored_hashes(bloom):
+    with open(DATA_FILE, 'wb') as f:
+        pickle.dump(bloom, f)
 
-def save_stored_hashes(data):
-    with open(DATA_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+def open_seen_db():
+    con = sqlite3.connect(DB_FILE)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('CREATE TABLE IF NOT EXISTS seen(h BLOB PRIMARY KEY)')
+    return con
 
 def news_hash(item):
     title = item.get('title') or ''
     link = item.get('link') or ''
-    return hashlib.sha256((title + link).encode()).hexdigest()
+    # Raw 16-byte digest: half the key size of the hex form with none of
+    # the per-entry str overhead, and it feeds the Bloom filter directly.
+    return hashlib.blake2b((title + link).encode('utf-8'), digest_size=16).digest()
 
 def load_organizations():
     if not os.path.exists(ORG_FILE):
-        print(f"Missing {ORG_FILE}")
+        log.warning("Missing %s", ORG_FILE)
         return []
     with open(ORG_FILE, 'r') as f:
         return [line.strip() for line in f if line.strip()]
 
 def load_filters():
     if not os.path.exists(FILTERS_FILE):
-        print(f"Missing {FILTERS_FILE}, continuing without context filters.")
+        log.warning("Missing %s, continuing without context filters.", FILTERS_FILE)
         return {}
-    with open(FILTERS_FILE, 'r') as f:
-        return json.load(f)
-
-def article_within_last_24_hours(pub_date_str):
-    formats = [
-        "%Y-%m-%dT%H:%M:%SZ",
-        "%m/%d/%Y, %I:%M %p, +0000 UTC",
-        "%b %d, %Y",
-        "%B %d, %Y"
-    ]
+    with open(FILTERS_FILE, 'rb') as f:
+        return orjson.loads(f.read())
+
+_DATE_FORMATS = [
+    "%m/%d/%Y, %I:%M %p, +0000 UTC",
+    "%b %d, %Y",
+    "%B %d, %Y"
+]
+
+@functools.lru_cache(maxsize=4096)
+def _parse_pub_date(pub_date_str):
+    # Aggregated sources repeat pub_date strings heavily, so cache parses;
+    # the common ISO format is dispatched by a cheap prefix check instead
+    # of burning a strptime attempt per candidate format.
+    if len(pub_date_str) > 4 and pub_date_str[:4].isdigit() and pub_date_str[4] == '-':
+        formats = ["%Y-%m-%dT%H:%M:%SZ"]
+    else:
+        formats = _DATE_FORMATS
     for fmt in formats:
         try:
-            pub_date = datetime.strptime(pub_date_str, fmt).replace(tzinfo=timezone.utc)
-            return datetime.now(timezone.utc) - pub_date <= timedelta(hours=24)
+            return datetime.strptime(pub_date_str, fmt).replace(tzinfo=timezone.utc)
         except ValueError:
             continue
-    print(f"Could not parse publication date: {pub_date_str}")
-    return False
+    log.warning("Could not parse publication date: %s", pub_date_str)
+    return None
+
+def article_within_last_24_hours(pub_date_str, now=None):
+    pub_date = _parse_pub_date(pub_date_str)
+    if pub_date is None:
+        return False
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return now - pub_date <= timedelta(hours=24)
+
+_BLACK_RE = None
+_WHITE_RE = None
+
+def compile_source_filters(filters):
+    """Pop optional _blacklist_sources/_whitelist_sources lists out of the
+    filters mapping and precompile each into a single alternation regex,
+    so the per-article check is one C-level search instead of a Python
+    loop of substring tests per list entry."""
+    global _BLACK_RE, _WHITE_RE
+    blacklist = filters.pop('_blacklist_sources', None)
+    whitelist = filters.pop('_whitelist_sources', None)
+    _BLACK_RE = re.compile('|'.join(map(re.escape, blacklist)), re.IGNORECASE) if blacklist else None
+    _WHITE_RE = re.compile('|'.join(map(re.escape, whitelist)), re.IGNORECASE) if whitelist else None
+
+def is_source_allowed(source):
+    if _BLACK_RE and _BLACK_RE.search(source):
+        return False
+    if _WHITE_RE and not _WHITE_RE.search(source):
+        return False
+    return True
+
+# Maps A-Z to a-z at byte level, skipping the full Unicode case folding
+# that str.lower() performs; the filter keywords are plain ASCII.
+_LOWER = bytes.maketrans(bytes(range(65, 91)), bytes(range(97, 123)))
 
-def filter_articles_by_keywords(articles, keywords):
-    if not keywords:
+def _lowered_content(article):
+    raw = (article.get('title', '') + ' ' + article.get('snippet', '')).encode('utf-8', 'ignore')
+    return raw.translate(_LOWER)
+
+@functools.lru_cache(maxsize=128)
+def _build_automaton(keywords_lower):
+    # Stock pyahocorasick wheels build unicode automatons, so byte strings
+    # are matched through a latin-1 view on both sides; ASCII keywords
+    # cannot false-match inside multi-byte UTF-8 sequences (all >= 0x80).
+    automaton = ahocorasick.Automaton()
+    for kw in keywords_lower:
+        automaton.add_word(kw.decode('latin-1'), kw)
+    automaton.make_automaton()
+    return automaton
+
+def build_matchers(filters):
+    """Lowercase each org's keywords and compile its matcher once at
+    startup, so the per-org loop is a dict lookup instead of re-lowercasing
+    and rebuilding per call. Keyword lists under 4 entries keep a plain
+    substring scan since automaton construction would dominate."""
+    matchers = {}
+    for org, keywords in filters.items():
+        if not keywords:
+            continue
+        keywords_lower = tuple(sorted(kw.lower().encode('utf-8') for kw in keywords))
+        automaton = _build_automaton(keywords_lower) if len(keywords_lower) >= 4 else None
+        matchers[org] = (keywords_lower, automaton)
+    return matchers
+
+def filter_articles(articles, matcher):
+    if matcher is None:
         return articles
-    keywords_lower = [kw.lower() for kw in keywords]
-    return [a for a in articles if any(kw in (a.get('title', '') + ' ' + a.get('snippet', '')).lower() for kw in keywords_lower)]
+    keywords_lower, automaton = matcher
+    if automaton is None:
+        return [a for a in articles if any(kw in _lowered_content(a) for kw in keywords_lower)]
+    # One C-level Aho-Corasick pass per article instead of a Python-level
+    # substring scan per (article, keyword) pair.
+    return [
+        a for a in articles
+        if next(automaton.iter(_lowered_content(a).decode('latin-1')), None) is not None
+    ]
 
-def fetch_news_serpapi(query, api_key, keywords=None):
-    print(f"Trying SerpAPI for: {query}")
+class RateLimiter:
+    """Token bucket pacing outbound requests to at most `rate` per `per` seconds."""
+
+    def __init__(self, rate, per=1.0):
+        self._tokens = asyncio.Queue(maxsize=rate)
+        for _ in range(rate):
+            self._tokens.put_nowait(None)
+        self._rate = rate
+        self._per = per
+        self._refill_task = None
+
+    async def _refill(self):
+        while True:
+            await asyncio.sleep(self._per / self._rate)
+            try:
+                self._tokens.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    async def acquire(self):
+        if self._refill_task is None:
+            self._refill_task = asyncio.get_running_loop().create_task(self._refill())
+        await self._tokens.get()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+async def _serpapi_search(session, limiter, params):
+    async with limiter:
+        async with session.get("https://serpapi.com/search.json", params=params) as resp:
+            if resp.status != 200:
+                log.warning("SerpAPI failed: %s", await resp.text())
+                return None
+            return orjson.loads(await resp.read()).get("news_results", [])
+
+def _collect_serpapi_articles(data):
+    now = datetime.now(timezone.utc)
+    articles = []
+    for i in data:
+        if i.get("date") and not article_within_last_24_hours(i.get("date"), now):
+            continue
+        articles.append({
+            "title": i.get("title"),
+            "link": i.get("link"),
+            "snippet": i.get("snippet", ""),
+            "pub_date": i.get("date"),
+            "source": i.get("source")
+        })
+        if len(articles) >= 5:
+            break
+    return articles
+
+async def fetch_news_serpapi(session, limiter, query, api_key, keywords=None):
+    log.info("Trying SerpAPI for: %s", query)
     query_string = f"{query} ({' OR '.join(keywords)})" if keywords else query
     params = {
         "engine": "google_news",
@@ -73,72 +259,143 @@ def fetch_news_serpapi(query, api_key, keywords=None):
         "gl": "us",
         "sort_by": "date",
         "tbs": "qdr:d",
-        "num": 100
+        "num": 20
     }
     try:
-        resp = requests.get("https://serpapi.com/search.json", params=params)
-        if resp.status_code != 200:
-            print(f"SerpAPI failed: {resp.text}")
+        data = await _serpapi_search(session, limiter, params)
+        if data is None:
             return []
-        data = resp.json().get("news_results", [])
-        return [
-            {
-                "title": i.get("title"),
-                "link": i.get("link"),
-                "snippet": i.get("snippet", ""),
-                "pub_date": i.get("date"),
-                "source": i.get("source")
-            }
-            for i in data
-            if not i.get("date") or article_within_last_24_hours(i.get("date"))
-        ][:5]
+        articles = _collect_serpapi_articles(data)
+        if len(articles) < 5 and len(data) >= 20:
+            # The small page was full but date-filtering left fewer than 5;
+            # take one deeper shot before giving up on this source.
+            params["num"] = 100
+            data = await _serpapi_search(session, limiter, params)
+            if data:
+                articles = _collect_serpapi_articles(data)
+        return articles
     except Exception as e:
-        print(f"SerpAPI exception: {e}")
+        log.warning("SerpAPI exception: %s", e)
         return []
 
-def fetch_news_googleapi(query, google_api_key, cse_id, keywords=None):
-    print(f"Trying Google Custom Search API for: {query}")
+async def fetch_news_googleapi(session, limiter, query, google_api_key, cse_id, keywords=None):
+    log.info("Trying Google Custom Search API for: %s", query)
     query_string = f"{query} {' '.join(keywords)}" if keywords else query
     params = {
         "key": google_api_key,
         "cx": cse_id,
         "q": query_string,
-        "sort": "date"
+        "sort": "date",
+        "num": 5
     }
     try:
-        resp = requests.get("https://www.googleapis.com/customsearch/v1", params=params)
-        if resp.status_code != 200:
-            print(f"Google API failed: {resp.text}")
-            return []
-        items = resp.json().get("items", [])
-        return [
-            {
-                "title": i.get("title"),
-                "link": i.get("link"),
-                "snippet": i.get("snippet", ""),
-                "pub_date": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "source": i.get("displayLink", "")
-            }
-            for i in items
-        ][:5]
+        async with limiter:
+            async with session.get("https://www.googleapis.com/customsearch/v1", params=params) as resp:
+                if resp.status != 200:
+                    log.warning("Google API failed: %s", await resp.text())
+                    return []
+                items = orjson.loads(await resp.read()).get("items", [])
+                return [
+                    {
+                        "title": i.get("title"),
+                        "link": i.get("link"),
+                        "snippet": i.get("snippet", ""),
+                        "pub_date": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "source": i.get("displayLink", "")
+                    }
+                    for i in items
+                ]
     except Exception as e:
-        print(f"Google API exception: {e}")
+        log.warning("Google API exception: %s", e)
         return []
 
+def _dedup(articles, bloom):
+    """CPU half of dedup: hash each article and probe the Bloom filter.
+
+    Runs on a worker thread while other fetches are still in flight, so
+    it only reads shared state. Bloom misses are definitely new; Bloom
+    hits still need DB confirmation. All store mutation happens in the
+    serial merge in main().
+    """
+    definite_new = []
+    maybe_seen = []
+    for art in articles:
+        h = news_hash(art)
+        if h in bloom:
+            maybe_seen.append((art, h))
+        else:
+            definite_new.append((art, h))
+    return definite_new, maybe_seen
+
+async def process_org(session, semaphore, limiter, org, serpapi_key, google_key, google_cse_id, keywords=None, matcher=None, bloom=None):
+    async with semaphore:
+        articles = await fetch_news_serpapi(session, limiter, org, serpapi_key, keywords)
+        if not articles:
+            articles = await fetch_news_googleapi(session, limiter, org, google_key, google_cse_id, keywords)
+    articles = [a for a in articles if is_source_allowed(a.get('source') or '')]
+    articles = filter_articles(articles, matcher)
+    # Hash and probe on a worker thread so this CPU work overlaps with
+    # other orgs' fetches that are still waiting on the network.
+    definite_new, maybe_seen = await asyncio.to_thread(_dedup, articles, bloom)
+    return org, definite_new, maybe_seen
+
+async def fetch_all_orgs(orgs, filters, matchers, bloom, serpapi_key, google_key, google_cse_id):
+    semaphore = asyncio.Semaphore(10)
+    limiter = RateLimiter(rate=10, per=1.0)
+    # One pool serves both serpapi.com and googleapis.com: the per-host
+    # cap keeps keep-alive sockets warm to each endpoint for the whole
+    # run, and the cached async DNS resolver avoids re-resolving either
+    # host between requests.
+    connector = aiohttp.TCPConnector(
+        limit=50,
+        limit_per_host=10,
+        ttl_dns_cache=300,
+        enable_cleanup_closed=True,
+        resolver=aiohttp.AsyncResolver()
+    )
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [
+            process_org(session, semaphore, limiter, org, serpapi_key, google_key, google_cse_id,
+                        filters.get(org), matchers.get(org), bloom)
+            for org in orgs
+        ]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    # Give closed transports a beat to drain before the loop shuts down.
+    await asyncio.sleep(0.1)
+    ok = []
+    for org, r in zip(orgs, results):
+        if isinstance(r, BaseException):
+            log.warning("Skipping %s after unexpected error: %s", org, r)
+        else:
+            ok.append(r)
+    return ok
+
 def summarize_article(article):
     snippet = article.get('snippet', '')
     summary = snippet[:120] + ('...' if len(snippet) > 120 else '')
     return f"{article.get('title', 'No Title')} - {summary}"
 
+# Compiled once at import; autoescape also stops article titles with
+# markup in them from breaking (or injecting into) the email HTML.
+_DIGEST_TEMPLATE = jinja2.Environment(autoescape=True).from_string(
+    "<h2>Daily News Summary - {{ date }}</h2>"
+    "{% for org, articles in news.items() %}"
+    "<h3>{{ org }}</h3><ul>"
+    "{% for a in articles %}"
+    "<li><a href='{{ a.get('link') or '#' }}'>{{ summarize(a) }}</a>"
+    " ({{ a.get('pub_date') or 'N/A' }}) - <i>{{ a.get('source') or 'N/A' }}</i></li>"
+    "{% endfor %}"
+    "</ul>"
+    "{% endfor %}"
+)
+
 def compose_email(news):
-    html = f"<h2>Daily News Summary - {datetime.utcnow().strftime('%Y-%m-%d')}</h2>"
-    for org, articles in news.items():
-        html += f"<h3>{org}</h3><ul>"
-        for a in articles:
-            summary = summarize_article(a)
-            html += f"<li><a href='{a.get('link', '#')}'>{summary}</a> ({a.get('pub_date', 'N/A')}) - <i>{a.get('source', 'N/A')}</i></li>"
-        html += "</ul>"
-    return html
+    return _DIGEST_TEMPLATE.render(
+        date=datetime.utcnow().strftime('%Y-%m-%d'),
+        news=news,
+        summarize=summarize_article
+    )
 
 def send_email(subject, html_body, to_email, from_email, from_pass):
     msg = MIMEMultipart('alternative')
@@ -147,20 +404,36 @@ def send_email(subject, html_body, to_email, from_email, from_pass):
     msg['Subject'] = subject
     msg.attach(MIMEText(html_body, 'html'))
 
+    # Serialize the MIME tree to wire bytes once up front; send_message
+    # would re-walk and re-encode the whole multipart inside smtplib.
+    # The SMTP policy emits CRLF line endings, which sendmail passes
+    # through untouched for bytes payloads.
+    buf = BytesIO()
+    BytesGenerator(buf, mangle_from_=False, policy=email.policy.SMTP).flatten(msg)
+
     try:
         server = smtplib.SMTP('smtp.gmail.com', 587)
         server.starttls()
         server.login(from_email, from_pass)
-        server.send_message(msg)
+        server.sendmail(from_email, [to_email], buf.getvalue())
         server.quit()
     except Exception as e:
-        print(f"Error sending email: {e}")
+        log.error("Error sending email: %s", e)
+
+async def _startup():
+    # Three independent file reads; overlap them on worker threads while
+    # the interpreter is still warming up.
+    return await asyncio.gather(
+        asyncio.to_thread(load_organizations),
+        asyncio.to_thread(load_filters),
+        asyncio.to_thread(load_stored_hashes),
+    )
 
 def main():
-    orgs = load_organizations()
-    filters = load_filters()
+    orgs, filters, stored_hashes = asyncio.run(_startup())
+    compile_source_filters(filters)
     if not orgs:
-        print("No organizations to process.")
+        log.warning("No organizations to process.")
         return
 
     # Load secrets from GitHub Actions environment
@@ -172,36 +445,51 @@ def main():
     google_cse_id = os.getenv("GOOGLE_CSE_ID")
 
     if not all([to_email, from_email, from_pass, serpapi_key, google_key, google_cse_id]):
-        print("Missing environment variables.")
+        log.error("Missing environment variables.")
         return
 
-    stored_hashes = load_stored_hashes()
+    matchers = build_matchers(filters)
+    con = open_seen_db()
     new_news = {}
 
-    for org in orgs:
-        keywords = filters.get(org, None)
-        articles = fetch_news_serpapi(org, serpapi_key, keywords)
-        if not articles:
-            articles = fetch_news_googleapi(org, google_key, google_cse_id, keywords)
-        if keywords:
-            articles = filter_articles_by_keywords(articles, keywords)
+    fetch_start = time.monotonic()
+    results = asyncio.run(fetch_all_orgs(orgs, filters, matchers, stored_hashes, serpapi_key, google_key, google_cse_id))
+    log.info("Fetched %d orgs in %.1fs", len(results), time.monotonic() - fetch_start)
 
+    # Serial merge: the worker threads only read the Bloom filter, so the
+    # store mutations (and cross-org duplicates within this run) are
+    # resolved here on one thread.
+    new_this_run = set()
+    for org, definite_new, maybe_seen in results:
         fresh_articles = []
-        for art in articles:
-            h = news_hash(art)
-            if not stored_hashes.get(h):
+        for art, h in definite_new:
+            if h in new_this_run:
+                continue
+            fresh_articles.append(art)
+            new_this_run.add(h)
+        for art, h in maybe_seen:
+            if h in new_this_run:
+                continue
+            if con.execute('SELECT 1 FROM seen WHERE h=?', (h,)).fetchone() is None:
                 fresh_articles.append(art)
-                stored_hashes[h] = True
-
+                new_this_run.add(h)
         if fresh_articles:
             new_news[org] = fresh_articles
 
+    # One bulk insert for everything new this run instead of a statement
+    # per hash; a single WAL commit covers the batch.
+    con.executemany('INSERT OR IGNORE INTO seen(h) VALUES (?)', [(h,) for h in new_this_run])
+    for h in new_this_run:
+        stored_hashes.add(h)
+
     if new_news:
         html_body = compose_email(new_news)
         send_email("Daily News Summary", html_body, to_email, from_email, from_pass)
     else:
-        print("No new articles found.")
+        log.info("No new articles found.")
 
+    con.commit()
+    con.close()
     save_stored_hashes(stored_hashes)
 
 if __name__ == "__main__":